@@ -2,18 +2,33 @@
 # Requiere: python-telegram-bot >=20 (async API)
 # Instalar: pip install python-telegram-bot==20.6
 
+import asyncio
 import json
 import logging
 import os
-import re
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit
+
+try:
+    import fcntl  # not available on Windows; fall back to unlocked writes there
+except ImportError:
+    fcntl = None
+
+try:
+    import orjson  # C-implemented JSON, much faster than stdlib on both paths
+except ImportError:
+    orjson = None
 
 from telegram import Update, constants
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes, MessageHandler, filters
+from telegram.request import HTTPXRequest
 
 # ---------- CONFIG ----------
 BOT_TOKEN = os.environ.get("TG_BOT_TOKEN")  # pon aquí tu token o usa variable de entorno
-DATA_FILE = "data.json"
+DATA_FILE = "data.json"  # legacy single-file store; split on first load
+META_FILE = "meta.json"  # channel + message ids, tiny, rewritten atomically
+LINKS_FILE = "links.jsonl"  # one link per line, appended on /add
 # ----------------------------
 
 logging.basicConfig(
@@ -21,42 +36,423 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _is_url(token: str) -> bool:
+    """Cheap scheme prefix check plus a real parse, so 'https://' with no host
+    is rejected instead of becoming a dead link in the channel."""
+    if not token.startswith(("http://", "https://")):
+        return False
+    try:
+        return bool(urlsplit(token).netloc)
+    except ValueError:  # e.g. malformed bracket URLs like 'http://['
+        return False
+
+
+# Shared default for .get("links", ...): the empty tuple is a singleton, so no
+# throwaway list is allocated when a category has no links key.
+_EMPTY: tuple = ()
+
+# Precomputed translate table: one C-level pass over the string, faster than
+# html.escape or chained .replace() calls.
+_HTML_TT = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+
+def _esc(s: str) -> str:
+    return s.translate(_HTML_TT)
+
+
+class TokenBucket:
+    """Token bucket shaping outbound Bot API calls so we stay under Telegram's
+    ~30 msg/s global cap instead of eating 429s and their retry-after stalls."""
+
+    def __init__(self, rate: float = 30.0, burst: int = 30):
+        self._rate = rate
+        self._capacity = float(burst)
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._last) * self._rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self._rate)
+
+
+_bucket = TokenBucket()
+
+
+async def _limited(coro):
+    """Await a Bot API coroutine after taking a token from the global bucket."""
+    await _bucket.acquire()
+    return await coro
+
+
+# Last text rendered into each channel message, keyed by message_id. Editing a
+# message with identical text costs an RTT and a "message is not modified" 400
+# from Telegram, so we skip those edits entirely.
+_rendered: Dict[int, str] = {}
+
+
+async def _edit_if_changed(bot, chat_id, msg_id: int, text: str, disable_preview: bool) -> None:
+    if _rendered.get(msg_id) == text:
+        return
+    await _limited(bot.edit_message_text(chat_id=chat_id, message_id=msg_id, text=text, parse_mode=constants.ParseMode.HTML, disable_web_page_preview=disable_preview))
+    _rendered[msg_id] = text
+
+
+def _lock_file(path: str, flags: int):
+    """Take an fcntl lock on a sibling lock file. Returns the open lock file,
+    or None where fcntl is unavailable (Windows)."""
+    if fcntl is None:
+        return None
+    lock_f = open(path + ".lock", "a+")
+    fcntl.flock(lock_f, flags)
+    return lock_f
+
+
+def _unlock_file(lock_f) -> None:
+    if lock_f is not None:
+        fcntl.flock(lock_f, fcntl.LOCK_UN)
+        lock_f.close()
+
+
+def _dumps_bytes(data: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _loads_bytes(raw: bytes) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _locked_save_json(path: str, data: Dict[str, Any]) -> None:
+    """Write JSON atomically: serialize to a temp file in the same directory,
+    fsync, then os.replace() over the target. An exclusive lock on a sibling
+    .lock file keeps concurrent read-modify-write cycles from interleaving."""
+    lock_f = _lock_file(path, fcntl.LOCK_EX) if fcntl else None
+    try:
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_dumps_bytes(data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        _unlock_file(lock_f)
+
+
+def _meta_from_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "channel_username": data.get("channel_username"),
+        "indice_message_id": data.get("indice_message_id"),
+        "categorias": {
+            cat: {"message_ids": info.get("message_ids", [])}
+            for cat, info in data["categorias"].items()
+        },
+    }
+
+
+def _append_links(records: List[Dict[str, Any]]) -> None:
+    """Append link records to links.jsonl — O(1) per /add, no full rewrite."""
+    lock_f = _lock_file(LINKS_FILE, fcntl.LOCK_EX) if fcntl else None
+    try:
+        with open(LINKS_FILE, "ab") as f:
+            f.write(b"".join(_dumps_line(rec) for rec in records))
+            f.flush()
+            os.fsync(f.fileno())
+    finally:
+        _unlock_file(lock_f)
+
+
+def _dumps_line(rec: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(rec) + b"\n"
+    return json.dumps(rec, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def _rewrite_links(data: Dict[str, Any]) -> None:
+    """Full atomic rewrite of links.jsonl (migration / explicit saves only)."""
+    lock_f = _lock_file(LINKS_FILE, fcntl.LOCK_EX) if fcntl else None
+    try:
+        tmp = LINKS_FILE + ".tmp"
+        with open(tmp, "wb") as f:
+            for cat, info in data["categorias"].items():
+                for item in info.get("links", _EMPTY):
+                    f.write(_dumps_line({"cat": cat, **item}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, LINKS_FILE)
+    finally:
+        _unlock_file(lock_f)
+
 
 def load_data() -> Dict[str, Any]:
+    if os.path.exists(META_FILE):
+        lock_f = _lock_file(META_FILE, fcntl.LOCK_SH) if fcntl else None
+        try:
+            with open(META_FILE, "rb") as f:
+                meta = _loads_bytes(f.read())
+            data = {
+                "channel_username": meta.get("channel_username"),
+                "indice_message_id": meta.get("indice_message_id"),
+                "categorias": {
+                    cat: {"message_ids": info.get("message_ids", []), "links": []}
+                    for cat, info in meta["categorias"].items()
+                },
+            }
+            if os.path.exists(LINKS_FILE):
+                with open(LINKS_FILE, "rb") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        rec = _loads_bytes(line)
+                        cat = rec.pop("cat", None)
+                        if cat in data["categorias"]:
+                            data["categorias"][cat]["links"].append(rec)
+            return data
+        finally:
+            _unlock_file(lock_f)
+    # Legacy single-file store: split it into meta.json + links.jsonl
     if not os.path.exists(DATA_FILE):
-        raise FileNotFoundError(f"{DATA_FILE} not found. Create it from the template.")
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+        raise FileNotFoundError(f"{META_FILE} not found. Create {DATA_FILE} from the template.")
+    lock_f = _lock_file(DATA_FILE, fcntl.LOCK_SH) if fcntl else None
+    try:
+        with open(DATA_FILE, "rb") as f:
+            data = _loads_bytes(f.read())
+    finally:
+        _unlock_file(lock_f)
+    _migrate_message_ids(data)
+    _locked_save_json(META_FILE, _meta_from_data(data))
+    _rewrite_links(data)
+    logger.info("Migrated %s into %s + %s", DATA_FILE, META_FILE, LINKS_FILE)
+    return data
+
+
+# In-memory cache: data.json is read once and mutated in place; disk is only
+# touched in save_data(). Handlers serialize their read-modify-write cycles
+# with _data_lock. If data.json is edited out-of-band, the mtime check reloads.
+_DATA: Optional[Dict[str, Any]] = None
+_DATA_MTIME: Optional[float] = None
+_data_lock = asyncio.Lock()
+
+# Secondary index: lowercased category name -> canonical key, so /add resolves
+# a category with one hash lookup instead of scanning and lowercasing all keys.
+_cat_index: Dict[str, str] = {}
+
+# Per-category sets of lowercased URLs so /add rejects duplicates with an O(1)
+# membership check instead of letting category messages grow without bound.
+_url_sets: Dict[str, set] = {}
+
+
+def _rebuild_cat_index(data: Dict[str, Any]) -> None:
+    _cat_index.clear()
+    _cat_index.update({k.lower(): k for k in data["categorias"]})
+    _url_sets.clear()
+    for cat, info in data["categorias"].items():
+        _url_sets[cat] = {item["url"].lower() for item in info.get("links", _EMPTY)}
+
+
+def _migrate_message_ids(data: Dict[str, Any]) -> None:
+    """Legacy data.json stored one message_id per category; categories now
+    track a list of message_ids so long categories can span several messages."""
+    for info in data["categorias"].values():
+        if "message_ids" not in info:
+            msg_id = info.pop("message_id", None)
+            info["message_ids"] = [msg_id] if msg_id else []
+
+
+async def aload_data() -> Dict[str, Any]:
+    """load_data on a worker thread so the event loop stays responsive."""
+    return await asyncio.to_thread(load_data)
+
+
+async def asave_data(data: Dict[str, Any]) -> None:
+    """save_data on a worker thread so the event loop stays responsive."""
+    await asyncio.to_thread(save_data, data)
+
+
+def _store_mtime():
+    return tuple(
+        os.stat(path).st_mtime if os.path.exists(path) else None
+        for path in (META_FILE, LINKS_FILE, DATA_FILE)
+    )
+
+
+async def _get_data() -> Dict[str, Any]:
+    global _DATA, _DATA_MTIME
+    if _DATA is not None and _store_mtime() == _DATA_MTIME:
+        return _DATA
+    async with _data_lock:
+        # Re-check under the lock: a flush in progress bumps the mtimes before
+        # releasing it, so what looked like an out-of-band edit may just have
+        # been our own half-finished write.
+        if _DATA is None or _store_mtime() != _DATA_MTIME:
+            _DATA = await aload_data()
+            _DATA_MTIME = _store_mtime()  # migration may have just created files
+            _migrate_message_ids(_DATA)
+            _rebuild_cat_index(_DATA)
+    return _DATA
 
 
 def save_data(data: Dict[str, Any]) -> None:
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    global _DATA, _DATA_MTIME
+    _locked_save_json(META_FILE, _meta_from_data(data))
+    _rewrite_links(data)
+    _DATA = data
+    _DATA_MTIME = _store_mtime()
+
+
+# Handlers don't write to disk directly: they mutate the cache, queue any new
+# links in _pending_links, call _mark_dirty(), and return immediately. The
+# background _flusher coalesces bursts of mutations into one append to
+# links.jsonl plus one atomic rewrite of the tiny meta.json.
+_dirty = asyncio.Event()
+_pending_links: List[Dict[str, Any]] = []
+
+
+def _mark_dirty() -> None:
+    _dirty.set()
+
+
+async def _flusher() -> None:
+    global _DATA_MTIME
+    while True:
+        await _dirty.wait()
+        await asyncio.sleep(0.1)  # coalesce back-to-back mutations
+        _dirty.clear()
+        failed = False
+        # The writes and the mtime update form one critical section: a reader
+        # hitting _get_data() between them would see mtime != _DATA_MTIME and
+        # reload a half-flushed store (links appended, meta still stale).
+        async with _data_lock:
+            pending = _pending_links[:]
+            del _pending_links[:]
+            meta = _meta_from_data(_DATA) if _DATA is not None else None
+            try:
+                if pending:
+                    await asyncio.to_thread(_append_links, pending)
+                    pending = []
+                if meta is not None:
+                    await asyncio.to_thread(_locked_save_json, META_FILE, meta)
+                _DATA_MTIME = _store_mtime()  # our own writes are not out-of-band edits
+            except Exception as e:
+                # A transient write failure (disk full, permissions) must not
+                # kill the task; re-queue what didn't land and retry after a
+                # pause.
+                logger.error("Failed to flush store, will retry: %s", e)
+                _pending_links[:0] = pending
+                failed = True
+        if failed:
+            _mark_dirty()
+            await asyncio.sleep(1.0)
 
 
 def format_index(data: Dict[str, Any]) -> str:
-    lines = ["📚 <b>ÍNDICE</b>\n"]
-    for cat, info in data["categorias"].items():
-        count = len(info.get("links", []))
-        # If message_id exists and channel_username is set, build a t.me link to jump
+    ch = data.get("channel_username")
+    ch_prefix = ch.lstrip("@") if ch else None
+
+    def _line(cat, info):
+        count = len(info.get("links", _EMPTY))
+        # If the category has messages and channel_username is set, build a
+        # t.me link jumping to the first one
         jump = ""
-        if data.get("channel_username") and info.get("message_id"):
-            jump = f" — <a href=\"https://t.me/{data['channel_username'].lstrip('@')}/{info['message_id']}\">ir</a>"
-        lines.append(f"• <b>{cat}</b> ({count}){jump}")
-    return "\n".join(lines)
+        ids = info.get("message_ids")
+        if ch_prefix and ids:
+            jump = f" — <a href=\"https://t.me/{ch_prefix}/{ids[0]}\">ir</a>"
+        return f"• <b>{_esc(cat)}</b> ({count}){jump}"
+
+    return "📚 <b>ÍNDICE</b>\n\n" + "\n".join(
+        _line(cat, info) for cat, info in data["categorias"].items()
+    )
+
+
+# Memoized index render: the index text only depends on the channel username
+# and each category's (name, link count, message_id), so skip rebuilding the
+# HTML when none of that changed (e.g. repeated /refresh).
+_last_index_key = None
+_last_index_text = None
+
+
+def _get_index_text(data: Dict[str, Any]) -> str:
+    global _last_index_key, _last_index_text
+    key = (
+        data.get("channel_username"),
+        tuple((cat, len(info.get("links", _EMPTY)), tuple(info.get("message_ids", _EMPTY)))
+              for cat, info in data["categorias"].items()),
+    )
+    if key != _last_index_key:
+        _last_index_text = format_index(data)
+        _last_index_key = key
+    return _last_index_text
+
+
+# Stay comfortably under Telegram's 4096-char message limit; once a category
+# outgrows one message its links spill into continuation messages.
+_MAX_MSG_LEN = 4000
 
 
-def format_category_message(cat_name: str, links: List[Dict[str, str]]) -> str:
-    header = f"📎 <b>{cat_name.upper()}</b> ({len(links)} enlaces)\n\n"
+def format_category_chunks(cat_name: str, links: List[Dict[str, str]]) -> List[str]:
+    """Render a category as one or more messages, each under _MAX_MSG_LEN."""
+    cat_html = _esc(cat_name.upper())
+    header = f"📎 <b>{cat_html}</b> ({len(links)} enlaces)\n\n"
     if not links:
-        return header + "_No hay enlaces aún. Agrega alguno con_ /add"
-    lines = []
+        return [header + "_No hay enlaces aún. Agrega alguno con_ /add"]
+    chunks = []
+    current = [header]
+    size = len(header)
     for i, item in enumerate(links, start=1):
-        title = item.get("texto") or item.get("url")
-        url = item.get("url")
-        # Use markdown (HTML escape is handled by telegram when parse_mode is HTML)
-        lines.append(f"{i}. <a href=\"{url}\">{title}</a>")
-    return header + "\n".join(lines)
+        line = f"{i}. <a href=\"{_esc(item['url'])}\">{_esc(item.get('texto') or item['url'])}</a>\n"
+        if size + len(line) > _MAX_MSG_LEN and len(current) > 1:
+            chunks.append("".join(current).rstrip("\n"))
+            cont = f"📎 <b>{cat_html}</b> (cont.)\n\n"
+            current = [cont]
+            size = len(cont)
+        current.append(line)
+        size += len(line)
+    chunks.append("".join(current).rstrip("\n"))
+    return chunks
+
+
+async def _sync_category_messages(bot_obj, chat_id, cat: str, info: Dict[str, Any]) -> None:
+    """Edit/send the chunked messages for a category so the channel matches the
+    current links: edit existing chunks in parallel, send overflow chunks in
+    order, and drop messages for chunks that no longer exist."""
+    chunks = format_category_chunks(cat, info.get("links", _EMPTY))
+    ids = info.setdefault("message_ids", [])
+    results = await asyncio.gather(
+        *(_edit_if_changed(bot_obj, chat_id, msg_id, text, False) for msg_id, text in zip(ids, chunks)),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error("Failed to edit category message for '%s': %s", cat, result)
+    ids_changed = False
+    for text in chunks[len(ids):]:
+        msg = await _limited(bot_obj.send_message(chat_id=chat_id, text=text, parse_mode=constants.ParseMode.HTML, disable_web_page_preview=False))
+        ids.append(msg.message_id)
+        _rendered[msg.message_id] = text
+        ids_changed = True
+    for msg_id in ids[len(chunks):]:
+        try:
+            await _limited(bot_obj.delete_message(chat_id=chat_id, message_id=msg_id))
+        except Exception as e:
+            logger.error("Failed to delete stale chunk of '%s': %s", cat, e)
+        _rendered.pop(msg_id, None)
+        ids_changed = True
+    del ids[len(chunks):]
+    if ids_changed:
+        # The Bot API round-trips above can outlast the flusher's coalesce
+        # window, so re-mark dirty or the new ids never reach meta.json.
+        _mark_dirty()
 
 
 async def ensure_channel_messages(app):
@@ -64,7 +460,7 @@ async def ensure_channel_messages(app):
     If any message_id in data.json is null, create the messages in the channel
     and store their message_ids. This runs at startup.
     """
-    data = load_data()
+    data = await _get_data()
     channel = data.get("channel_username")
     if not channel:
         logger.warning("channel_username is null in data.json. Skipping auto-initialization.")
@@ -75,23 +471,22 @@ async def ensure_channel_messages(app):
 
     # Ensure index exists first
     if not data.get("indice_message_id"):
-        text = format_index(data)
-        msg = await app.bot.send_message(chat_id=chat_id, text=text, parse_mode=constants.ParseMode.HTML, disable_web_page_preview=True)
+        text = _get_index_text(data)
+        msg = await _limited(app.bot.send_message(chat_id=chat_id, text=text, parse_mode=constants.ParseMode.HTML, disable_web_page_preview=True))
         data["indice_message_id"] = msg.message_id
+        _rendered[msg.message_id] = text
         logger.info(f"Created index message id={msg.message_id}")
         modified = True
 
-    # Ensure each category message exists
+    # Ensure each category's messages exist
     for cat, info in data["categorias"].items():
-        if not info.get("message_id"):
-            text = format_category_message(cat, info.get("links", []))
-            msg = await app.bot.send_message(chat_id=chat_id, text=text, parse_mode=constants.ParseMode.HTML, disable_web_page_preview=False)
-            data["categorias"][cat]["message_id"] = msg.message_id
-            logger.info(f"Created message for category '{cat}' id={msg.message_id}")
+        if not info.get("message_ids"):
+            await _sync_category_messages(app.bot, chat_id, cat, info)
+            logger.info(f"Created messages for category '{cat}' ids={info['message_ids']}")
             modified = True
 
     if modified:
-        save_data(data)
+        await asave_data(data)
         logger.info("data.json updated with new message ids.")
 
 
@@ -103,84 +498,79 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
-def parse_add_args(text: str):
-    # Remove leading command if present
-    # Expect: /add <category> <title...> <url>
+def parse_add_args(args: List[str]):
+    # Expect: <category> <title...> <url>; python-telegram-bot already splits
+    # everything after the command (including /add@botname) into context.args.
     # We'll try to find the last token that looks like a URL
-    parts = text.strip().split()
-    # remove command
-    if parts and parts[0].startswith("/add"):
-        parts = parts[1:]
-    if not parts:
+    if not args:
         return None, None, None
-    # Find last URL-like token
     url_idx = None
-    url_pattern = re.compile(r"^https?://\S+$")
-    for i in range(len(parts) - 1, -1, -1):
-        if url_pattern.match(parts[i]):
+    for i in range(len(args) - 1, -1, -1):
+        if _is_url(args[i]):
             url_idx = i
             break
     if url_idx is None:
         return None, None, None
-    url = parts[url_idx]
+    url = args[url_idx]
     # category is first token
-    category = parts[0]
+    category = args[0]
     # title is everything between 1..url_idx-1
-    title = " ".join(parts[1:url_idx]) if url_idx > 1 else ""
+    title = " ".join(args[1:url_idx]) if url_idx > 1 else ""
     return category, title, url
 
 
 async def add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    raw = update.message.text
-    category, title, url = parse_add_args(raw)
+    category, title, url = parse_add_args(context.args)
     if not category or not url:
         await update.message.reply_text(
             "Uso inválido. Formato correcto:\n/add <Categoría> <Título opcional> <URL>\nEjemplo:\n/add Diseño Vectorizar imagen https://example.com"
         )
         return
 
-    data = load_data()
+    data = await _get_data()
     # match category case-insensitively
-    matches = [c for c in data["categorias"].keys() if c.lower() == category.lower()]
-    if not matches:
+    cat_key = _cat_index.get(category.lower())
+    if cat_key is None:
         await update.message.reply_text(f"Categoría '{category}' no encontrada. Usa /list para ver categorías disponibles.")
         return
-    cat_key = matches[0]
 
-    entry = {"texto": title or url, "url": url, "autor": user.username or user.full_name}
-    data["categorias"][cat_key].setdefault("links", []).append(entry)
-    save_data(data)
+    url_key = url.lower()
+    if url_key in _url_sets.get(cat_key, ()):
+        await update.message.reply_text(f"Ese enlace ya existe en <b>{cat_key}</b>.", parse_mode=constants.ParseMode.HTML)
+        return
 
-    # Update the category message and index in the channel (if channel configured)
+    entry = {"texto": title or url, "url": url, "autor": user.username or user.full_name}
+    async with _data_lock:
+        data["categorias"][cat_key].setdefault("links", []).append(entry)
+        _url_sets.setdefault(cat_key, set()).add(url_key)
+        _pending_links.append({"cat": cat_key, **entry})
+    _mark_dirty()
+
+    # Update the category message and index in the channel (if channel configured).
+    # Both edits are independent Bot API calls, so run them concurrently.
     channel = data.get("channel_username")
     if channel:
         chat_id = channel
-        # update category message
-        cat_msg_id = data["categorias"][cat_key]["message_id"]
-        new_text = format_category_message(cat_key, data["categorias"][cat_key]["links"])
-        try:
-            await context.bot.edit_message_text(chat_id=chat_id, message_id=cat_msg_id, text=new_text, parse_mode=constants.ParseMode.HTML, disable_web_page_preview=False)
-        except Exception as e:
-            logger.error("Failed to edit category message: %s", e)
-        # update index
+        coros = [_sync_category_messages(context.bot, chat_id, cat_key, data["categorias"][cat_key])]
         idx_id = data.get("indice_message_id")
         if idx_id:
-            idx_text = format_index(data)
-            try:
-                await context.bot.edit_message_text(chat_id=chat_id, message_id=idx_id, text=idx_text, parse_mode=constants.ParseMode.HTML, disable_web_page_preview=True)
-            except Exception as e:
-                logger.error("Failed to edit index message: %s", e)
+            idx_text = _get_index_text(data)
+            coros.append(_edit_if_changed(context.bot, chat_id, idx_id, idx_text, True))
+        results = await asyncio.gather(*coros, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Failed to edit channel message: %s", result)
 
     await update.message.reply_text(f"Enlace agregado a <b>{cat_key}</b> ✅", parse_mode=constants.ParseMode.HTML)
 
 
 async def list_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    data = load_data()
-    lines = ["📚 <b>Categorías disponibles:</b>\n"]
-    for cat, info in data["categorias"].items():
-        lines.append(f"• <b>{cat}</b> — {len(info.get('links', []))} enlaces")
-    text = "\n".join(lines)
+    data = await _get_data()
+    text = "📚 <b>Categorías disponibles:</b>\n\n" + "\n".join(
+        f"• <b>{_esc(cat)}</b> — {len(info.get('links', _EMPTY))} enlaces"
+        for cat, info in data["categorias"].items()
+    )
     await update.message.reply_text(text, parse_mode=constants.ParseMode.HTML)
 
 
@@ -188,45 +578,47 @@ async def refresh_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Regenera todos los mensajes del canal (útil si algo salió mal).
     """
-    data = load_data()
+    data = await _get_data()
     channel = data.get("channel_username")
     if not channel:
         await update.message.reply_text("channel_username no está configurado en data.json. Edita el archivo y pon el @username del canal.")
         return
     chat_id = channel
-    # Rebuild category messages
-    for cat, info in data["categorias"].items():
-        msg_id = info.get("message_id")
-        text = format_category_message(cat, info.get("links", []))
+    # Hoist hot-loop lookups: locals beat repeated attribute/dict probes
+    bot_obj = context.bot
+    send = bot_obj.send_message
+    HTML = constants.ParseMode.HTML
+
+    # Rebuild category messages; each category is independent, so fan them out
+    async def _refresh_category(cat, info):
         try:
-            if msg_id:
-                await context.bot.edit_message_text(chat_id=chat_id, message_id=msg_id, text=text, parse_mode=constants.ParseMode.HTML, disable_web_page_preview=False)
-            else:
-                msg = await context.bot.send_message(chat_id=chat_id, text=text, parse_mode=constants.ParseMode.HTML, disable_web_page_preview=False)
-                data["categorias"][cat]["message_id"] = msg.message_id
+            await _sync_category_messages(bot_obj, chat_id, cat, info)
         except Exception as e:
             logger.error("Error refreshing category %s: %s", cat, e)
 
+    await asyncio.gather(*(_refresh_category(cat, info) for cat, info in data["categorias"].items()))
+
     # Rebuild index
     idx_id = data.get("indice_message_id")
-    idx_text = format_index(data)
+    idx_text = _get_index_text(data)
     try:
         if idx_id:
-            await context.bot.edit_message_text(chat_id=chat_id, message_id=idx_id, text=idx_text, parse_mode=constants.ParseMode.HTML, disable_web_page_preview=True)
+            await _edit_if_changed(bot_obj, chat_id, idx_id, idx_text, True)
         else:
-            msg = await context.bot.send_message(chat_id=chat_id, text=idx_text, parse_mode=constants.ParseMode.HTML, disable_web_page_preview=True)
+            msg = await _limited(send(chat_id=chat_id, text=idx_text, parse_mode=HTML, disable_web_page_preview=True))
             data["indice_message_id"] = msg.message_id
+            _rendered[msg.message_id] = idx_text
     except Exception as e:
         logger.error("Error refreshing index: %s", e)
 
-    save_data(data)
+    _mark_dirty()
     await update.message.reply_text("Canal regenerado ✅")
 
 
 async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    data = load_data()
+    data = await _get_data()
     channel = data.get("channel_username") or "No configurado (usa data.json)"
-    total = sum(len(info.get("links", [])) for info in data["categorias"].values())
+    total = sum(len(info.get("links", _EMPTY)) for info in data["categorias"].values())
     await update.message.reply_text(f"Canal: {channel}\nCategorías: {len(data['categorias'])}\nEnlaces totales: {total}")
 
 
@@ -234,7 +626,7 @@ async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def echo_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = update.message.text.strip()
     # Quick URL detection
-    if text.startswith("http://") or text.startswith("https://"):
+    if text.startswith(("http://", "https://")):
         await update.message.reply_text("Si quieres agregar este enlace, usa:\n/add <Categoría> <Título opcional> <URL>\nEjemplo: /add Videos Video útil " + text)
     else:
         await update.message.reply_text("Comando no reconocido. Usa /add para agregar enlaces o /list para ver categorías.")
@@ -247,7 +639,17 @@ def main():
         logger.error("TG_BOT_TOKEN no configurado. Define la variable de entorno TG_BOT_TOKEN o edita BOT_TOKEN en el script.")
         return
 
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    # A bigger connection pool lets the gathered /add and /refresh edits reuse
+    # warm connections to api.telegram.org instead of queueing on the default
+    # pool or paying a TLS handshake per call.
+    request = HTTPXRequest(connection_pool_size=64, connect_timeout=5.0, read_timeout=10.0, pool_timeout=1.0)
+    app = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .request(request)
+        .get_updates_request(HTTPXRequest(connection_pool_size=1, connect_timeout=5.0, read_timeout=10.0))
+        .build()
+    )
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("add", add_command))
@@ -259,12 +661,25 @@ def main():
     # On startup: create messages if needed (only works if channel_username is set)
     async def on_startup(app):
         logger.info("Aplicación iniciada — verificando canal...")
+        app.create_task(_flusher())
         await ensure_channel_messages(app)
 
     app.post_init = on_startup
 
     logger.info("Bot arrancando...")
-    app.run_polling()
+    webhook_url = os.environ.get("WEBHOOK_URL")
+    if webhook_url:
+        # Webhook mode: Telegram pushes updates the moment they arrive,
+        # removing the getUpdates polling latency. Needs an HTTPS terminator
+        # in front (e.g. the hosting platform's) pointing at WEBHOOK_URL.
+        app.run_webhook(
+            listen="0.0.0.0",
+            port=int(os.environ.get("PORT", "8443")),
+            webhook_url=webhook_url,
+            secret_token=os.environ.get("WEBHOOK_SECRET"),
+        )
+    else:
+        app.run_polling()
 
 
 if __name__ == "__main__":